@@ -4,7 +4,7 @@ import json
 import re
 import urllib.parse
 from dataclasses import dataclass
-from typing import Any, TypeAlias, TypeGuard
+from typing import Any, Mapping, TypeAlias, TypeGuard
 
 import aiohttp
 from bs4 import BeautifulSoup as BS
@@ -12,7 +12,7 @@ from bs4 import Tag
 
 from .exceptions import (DataDoesNotExist, FetchTimeout, LoginFailed,
                          MFConnectionError, MFInitializeError,
-                         MFScraptingError, NeedOTP)
+                         MFScraptingError, NeedOTP, SessionExpired)
 
 Account: TypeAlias = tuple[str] | tuple[str, str]
 
@@ -89,10 +89,17 @@ class MFTransaction:
 
 
 class MFScraper:
-    def __init__(self, id: int, passwd: str, timeout: int = 30) -> None:
+    def __init__(
+        self,
+        id: str,
+        passwd: str,
+        timeout: int = 30,
+        trace_configs: list[aiohttp.TraceConfig] | None = None,
+    ) -> None:
         self._id = id
         self._passwd = passwd
         self._timeout = timeout
+        self._trace_configs = trace_configs
         self._session = None
         self._account = None
         self._category = None
@@ -100,8 +107,14 @@ class MFScraper:
         self._otp_post_data = None
         self._is_logined = False
 
+    @property
+    def is_logined(self) -> bool:
+        return self._is_logined
+
     async def __aenter__(self):
-        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(self._timeout))
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(self._timeout), trace_configs=self._trace_configs
+        )
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
@@ -113,9 +126,11 @@ class MFScraper:
             raise MFInitializeError()
         try:
             async with self._session.get(url, headers=self._headers) as result:
+                if result.status in (401, 403) or "sign_in" in str(result.url):
+                    raise SessionExpired
                 result.raise_for_status()
                 return await result.text()
-        except (aiohttp.ServerTimeoutError, aiohttp.ClientResponseError) as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             raise MFConnectionError(e)
 
     async def _post(self, url: str, post_data: dict | None, is_text: bool) -> str:
@@ -123,9 +138,11 @@ class MFScraper:
             raise MFInitializeError()
         try:
             async with self._session.post(url, data=post_data, headers=self._headers) as result:
+                if result.status in (401, 403) or "sign_in" in str(result.url):
+                    raise SessionExpired
                 result.raise_for_status()
                 return await result.text() if is_text else ""
-        except (aiohttp.ServerTimeoutError, aiohttp.ClientResponseError) as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             raise MFConnectionError(e)
 
     async def _put(self, url: str, put_data: dict) -> None:
@@ -133,8 +150,10 @@ class MFScraper:
             raise MFInitializeError()
         try:
             async with self._session.put(url, params=put_data, headers=self._headers) as result:
+                if result.status in (401, 403) or "sign_in" in str(result.url):
+                    raise SessionExpired
                 result.raise_for_status()
-        except (aiohttp.ServerTimeoutError, aiohttp.ClientResponseError) as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             raise MFConnectionError(e)
 
     async def _delete(self, url: str) -> None:
@@ -142,8 +161,10 @@ class MFScraper:
             raise MFInitializeError()
         try:
             async with self._session.delete(url, headers=self._headers) as result:
+                if result.status in (401, 403) or "sign_in" in str(result.url):
+                    raise SessionExpired
                 result.raise_for_status()
-        except (aiohttp.ServerTimeoutError, aiohttp.ClientResponseError) as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             raise MFConnectionError(e)
 
     async def login(self) -> None:
@@ -155,7 +176,7 @@ class MFScraper:
                 qs = urllib.parse.urlparse(str(result.url)).query
                 qs_d = urllib.parse.parse_qs(qs)
                 ret = await result.text()
-        except (aiohttp.ServerTimeoutError, aiohttp.ClientResponseError) as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             raise MFConnectionError(e)
         soup = BS(ret, "html.parser")
         tmp = soup.select_one("meta[name=csrf-token]")
@@ -223,9 +244,20 @@ class MFScraper:
                     raise NeedOTP
                 else:
                     raise LoginFailed
-        except (aiohttp.ServerTimeoutError, aiohttp.ClientResponseError) as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             raise MFConnectionError(e)
 
+    async def relogin(self) -> None:
+        if not self._session:
+            raise MFInitializeError()
+        self._session.cookie_jar.clear()
+        self._account = None
+        self._category = None
+        self._headers = {}
+        self._otp_post_data = None
+        self._is_logined = False
+        await self.login()
+
     async def login_otp(self, otp) -> None:
         if not self._session:
             raise MFInitializeError()
@@ -253,12 +285,11 @@ class MFScraper:
                     self._is_logined = True
                 else:
                     raise LoginFailed
-        except (aiohttp.ServerTimeoutError, aiohttp.ClientResponseError) as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             raise MFConnectionError(e)
 
-    async def fetch(self, delay: int = 2, maxwaiting: int = 300, delta=60) -> None:
-        ret = await self._get("https://moneyforward.com")
-        soup = BS(ret, "html.parser")
+    def _parse_update_date(self, soup: BS) -> list[tuple[str, datetime.datetime]]:
+        ret: list[tuple[str, datetime.datetime]] = []
         urls = soup.select("a[data-remote=true]")
         for url in urls:
             tmp = url
@@ -289,15 +320,38 @@ class MFScraper:
                 int(tmp2[1]),
                 tzinfo=datetime.timezone(datetime.timedelta(hours=9)),
             )
+            ret.append((str(url["href"]), update_date))
+        return ret
+
+    async def fetch(
+        self,
+        delay: int = 2,
+        maxwaiting: int = 300,
+        delta=60,
+        attempted: Mapping[str, datetime.datetime] | None = None,
+    ) -> tuple[dict[str, datetime.datetime], list[str]]:
+        ret = await self._get("https://moneyforward.com")
+        soup = BS(ret, "html.parser")
+        now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9)))
+        update_dates = dict(self._parse_update_date(soup))
+        refreshed: list[str] = []
+        for href, update_date in update_dates.items():
+            if attempted is not None and href in attempted:
+                update_date = max(update_date, attempted[href])
             if now < update_date or now >= update_date + datetime.timedelta(minutes=delta):
-                await self._post("https://moneyforward.com" + str(url["href"]), None, False)
+                await self._post("https://moneyforward.com" + href, None, False)
+                refreshed.append(href)
         counter = 0
         while counter < maxwaiting:
             await asyncio.sleep(delay)
             counter += delay
             j = await self._get("https://moneyforward.com/accounts/polling")
             if not json.loads(j)["loading"]:
-                return
+                if refreshed:
+                    ret = await self._get("https://moneyforward.com")
+                    soup = BS(ret, "html.parser")
+                    update_dates = dict(self._parse_update_date(soup))
+                return update_dates, refreshed
         raise FetchTimeout
 
     async def get(self, year: int, month: int) -> list[MFTransaction]:
@@ -410,7 +464,11 @@ class MFScraper:
 
         if not self._account:
             self._account = asyncio.create_task(inner_get_account(self))
-        return await self._account
+        try:
+            return await self._account
+        except BaseException:
+            self._account = None
+            raise
 
     async def get_category(self) -> dict[tuple[str, str, str], dict[str, int]]:
         async def inner_get_category(
@@ -436,7 +494,11 @@ class MFScraper:
 
         if not self._category:
             self._category = asyncio.create_task(inner_get_category(self))
-        return await self._category
+        try:
+            return await self._category
+        except BaseException:
+            self._category = None
+            raise
 
     async def save(self, data: MFTransaction) -> None:
         categories = await self.get_category()
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Protocol, TypeAlias
+
+import aiohttp
+
+from . import MFScraper, MFTransaction
+from .exceptions import (DataDoesNotExist, LoginFailed, MFConnectionError,
+                         MFInitializeError, NeedOTP, SessionExpired)
+
+Month: TypeAlias = tuple[int, int]
+BackfillKey: TypeAlias = tuple[str, int, int]
+
+
+@dataclass
+class MFBackfillResult:
+    user: str
+    year: int
+    month: int
+    transactions: list[MFTransaction]
+
+
+class BackfillScraper(Protocol):
+    async def __aenter__(self) -> "BackfillScraper": ...
+
+    async def __aexit__(self, exc_type, exc, tb) -> None: ...
+
+    async def login(self) -> None: ...
+
+    async def relogin(self) -> None: ...
+
+    async def get(self, year: int, month: int) -> list[MFTransaction]: ...
+
+
+BackfillSink: TypeAlias = Callable[[MFBackfillResult], Awaitable[None]]
+ScraperFactory: TypeAlias = Callable[..., BackfillScraper]
+
+_budget_lock: Any = None
+_budget_next: Any = None
+_budget_interval: float = 0.0
+_cancel: Any = None
+_result_queue: Any = None
+
+
+def _init_worker(
+    lock: Any, next_time: Any, interval: float, cancel: Any, result_queue: Any
+) -> None:
+    global _budget_lock, _budget_next, _budget_interval, _cancel, _result_queue
+    _budget_lock = lock
+    _budget_next = next_time
+    _budget_interval = interval
+    _cancel = cancel
+    _result_queue = result_queue
+    # results not yet flushed when the parent gives up are re-fetched on resume
+    _result_queue.cancel_join_thread()
+
+
+def _consume_budget() -> None:
+    with _budget_lock:
+        now = time.time()
+        t = max(now, _budget_next.value)
+        _budget_next.value = t + _budget_interval
+    if t > now:
+        time.sleep(t - now)
+
+
+async def _on_request(session: aiohttp.ClientSession, ctx: Any, params: Any) -> None:
+    await asyncio.to_thread(_consume_budget)
+
+
+async def _get_month(mf: BackfillScraper, year: int, month: int) -> list[MFTransaction]:
+    try:
+        return await mf.get(year, month)
+    except DataDoesNotExist:
+        return []
+
+
+async def _backfill_months(
+    scraper_class: ScraperFactory, id: str, passwd: str, months: list[Month], timeout: int
+) -> None:
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request)
+    trace_config.on_request_redirect.append(_on_request)
+    current = months[0]
+    try:
+        async with scraper_class(id, passwd, timeout, trace_configs=[trace_config]) as mf:
+            await mf.login()
+            for current in months:
+                if _cancel.is_set():
+                    return
+                year, month = current
+                try:
+                    try:
+                        ret = await _get_month(mf, year, month)
+                    except SessionExpired:
+                        await mf.relogin()
+                        ret = await _get_month(mf, year, month)
+                except (
+                    MFConnectionError,
+                    MFInitializeError,
+                    SessionExpired,
+                    LoginFailed,
+                    NeedOTP,
+                ):
+                    raise
+                except Exception as e:
+                    _result_queue.put(("error", id, year, month, e))
+                    continue
+                _result_queue.put(("result", id, year, month, ret))
+    except Exception as e:
+        setattr(e, "backfill_month", current)
+        raise
+
+
+def _run_worker(
+    scraper_class: ScraperFactory, id: str, passwd: str, months: list[Month], timeout: int
+) -> None:
+    try:
+        asyncio.run(_backfill_months(scraper_class, id, passwd, months, timeout))
+    finally:
+        _result_queue.put(("done", id, 0, 0, None))
+
+
+def month_range(start: Month, end: Month) -> list[Month]:
+    ret = []
+    year, month = start
+    while (year, month) <= end:
+        ret.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return ret
+
+
+class MFBackfill:
+    def __init__(
+        self,
+        users: dict[str, str],
+        start: Month,
+        end: Month,
+        sink: BackfillSink,
+        checkpoint: str,
+        max_workers: int | None = None,
+        requests_per_second: float = 1.0,
+        timeout: int = 30,
+        scraper_class: ScraperFactory = MFScraper,
+    ) -> None:
+        if max_workers is not None and max_workers <= 0:
+            raise ValueError("max_workers must be greater than 0")
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be greater than 0")
+        self._users = users
+        self._start = start
+        self._end = end
+        self._sink = sink
+        self._checkpoint = checkpoint
+        self._max_workers = max_workers
+        self._interval = 1 / requests_per_second
+        self._timeout = timeout
+        self._scraper_class = scraper_class
+
+    def _load_checkpoint(self) -> set[BackfillKey]:
+        done: set[BackfillKey] = set()
+        if not os.path.exists(self._checkpoint):
+            return done
+        with open(self._checkpoint, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    id, year, month = json.loads(line)
+                except (ValueError, TypeError):
+                    continue
+                done.add((id, year, month))
+        return done
+
+    def _tasks(self, done: set[BackfillKey]) -> list[tuple[str, list[Month]]]:
+        ret = []
+        for id in self._users:
+            months = [x for x in month_range(self._start, self._end) if (id, *x) not in done]
+            if months:
+                ret.append((id, months))
+        return ret
+
+    async def run(self) -> dict[tuple[str, Month], BaseException]:
+        errors: dict[tuple[str, Month], BaseException] = {}
+        tasks = self._tasks(self._load_checkpoint())
+        if not tasks:
+            return errors
+        ctx = multiprocessing.get_context("spawn")
+        lock = ctx.Lock()
+        next_time = ctx.Value("d", 0.0, lock=False)
+        cancel = ctx.Event()
+        result_queue = ctx.Queue()
+        futures: dict[Future, tuple[str, Month]] = {}
+        executor = ProcessPoolExecutor(
+            self._max_workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(lock, next_time, self._interval, cancel, result_queue),
+        )
+        try:
+            with open(self._checkpoint, "a", encoding="utf-8") as cp:
+                for id, months in tasks:
+                    future = executor.submit(
+                        _run_worker,
+                        self._scraper_class,
+                        id,
+                        self._users[id],
+                        months,
+                        self._timeout,
+                    )
+                    futures[future] = (id, months[0])
+                pending = set(futures)
+                outstanding = set(id for id, _ in tasks)
+                while outstanding:
+                    try:
+                        kind, id, year, month, ret = await asyncio.to_thread(
+                            result_queue.get, timeout=0.1
+                        )
+                    except queue.Empty:
+                        finished, pending = wait(pending, timeout=0, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            if isinstance(future.exception(), BrokenProcessPool):
+                                outstanding.discard(futures[future][0])
+                        continue
+                    match kind:
+                        case "done":
+                            outstanding.discard(id)
+                        case "error":
+                            errors[(id, (year, month))] = ret
+                        case _:
+                            await self._sink(MFBackfillResult(id, year, month, ret))
+                            cp.write(json.dumps([id, year, month]) + "\n")
+                            cp.flush()
+        finally:
+            cancel.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            await asyncio.to_thread(executor.shutdown)
+        for future, (id, month) in futures.items():
+            if not future.cancelled() and (e := future.exception()) is not None:
+                errors[(id, getattr(e, "backfill_month", month))] = e
+        return errors
@@ -0,0 +1,115 @@
+import asyncio
+import datetime
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, TypeAlias
+
+from . import Account, MFScraper, MFTransaction
+from .exceptions import (DataDoesNotExist, FetchTimeout, MFConnectionError,
+                         MFScraptingError, SessionExpired)
+
+
+@dataclass
+class MFSyncResult:
+    synced_at: datetime.datetime
+    update_date: dict[str, datetime.datetime]
+    transactions: dict[tuple[int, int], list[MFTransaction]] = field(default_factory=dict)
+    balance: dict[Account, dict[str, int | datetime.date]] = field(default_factory=dict)
+
+
+MFSink: TypeAlias = Callable[[MFSyncResult], Awaitable[None]]
+
+
+class MFDaemon:
+    def __init__(
+        self,
+        scraper: MFScraper,
+        sink: MFSink,
+        delta: int = 60,
+        months: int = 1,
+        min_interval: float = 60,
+        max_interval: float = 3600,
+        retry_interval: float = 60,
+    ) -> None:
+        self._scraper = scraper
+        self._sink = sink
+        self._delta = delta
+        self._months = months
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._retry_interval = retry_interval
+        self._update_date: dict[str, datetime.datetime] = {}
+        self._attempted: dict[str, datetime.datetime] = {}
+        self._need_login = not scraper.is_logined
+        self._dirty = False
+        self._stop = asyncio.Event()
+
+    def _target_months(self, now: datetime.datetime) -> list[tuple[int, int]]:
+        ret = []
+        year, month = now.year, now.month
+        for _ in range(self._months):
+            ret.append((year, month))
+            year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+        return ret
+
+    def _next_interval(self, now: datetime.datetime) -> float:
+        if not self._update_date:
+            return self._max_interval
+        due = min(
+            max(update_date, self._attempted.get(href, update_date))
+            for href, update_date in self._update_date.items()
+        ) + datetime.timedelta(minutes=self._delta)
+        interval = (due - now).total_seconds()
+        return min(max(interval, self._min_interval), self._max_interval)
+
+    def _retry_after(self, failures: int) -> float:
+        return min(self._retry_interval * 2 ** (failures - 1), self._max_interval)
+
+    async def run_once(self) -> float:
+        update_date, refreshed = await self._scraper.fetch(
+            delta=self._delta, attempted=self._attempted
+        )
+        now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9)))
+        for href in refreshed:
+            self._attempted[href] = now
+        if update_date != self._update_date:
+            self._dirty = True
+        self._update_date = update_date
+        if self._dirty:
+            result = MFSyncResult(now, update_date)
+            for year, month in self._target_months(now):
+                try:
+                    result.transactions[(year, month)] = await self._scraper.get(year, month)
+                except DataDoesNotExist:
+                    result.transactions[(year, month)] = []
+            result.balance = await self._scraper.get_balance()
+            await self._sink(result)
+            self._dirty = False
+        return self._next_interval(now)
+
+    async def _wait(self, interval: float) -> None:
+        try:
+            await asyncio.wait_for(self._stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self) -> None:
+        self._stop.clear()
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                if self._need_login:
+                    await self._scraper.relogin()
+                    self._need_login = False
+                interval = await self.run_once()
+                failures = 0
+            except SessionExpired:
+                self._need_login = True
+                failures += 1
+                interval = self._retry_after(failures)
+            except (MFConnectionError, MFScraptingError, FetchTimeout):
+                failures += 1
+                interval = self._retry_after(failures)
+            await self._wait(interval)
+
+    def stop(self) -> None:
+        self._stop.set()
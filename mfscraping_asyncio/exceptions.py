@@ -24,3 +24,7 @@ class MFInitializeError(Exception):
 
 class FetchTimeout(Exception):
     pass
+
+
+class SessionExpired(Exception):
+    pass
@@ -0,0 +1,162 @@
+import asyncio
+import datetime
+import json
+import os
+import time
+
+import pytest
+
+from mfscraping_asyncio import MFTransaction
+from mfscraping_asyncio.backfill import MFBackfill, MFBackfillResult, month_range
+from mfscraping_asyncio.exceptions import MFConnectionError, MFScraptingError, SessionExpired
+
+
+class FakeScraper:
+    def __init__(self, id, passwd, timeout=30, trace_configs=None):
+        self._id = id
+        self._trace_configs = trace_configs or []
+        self._expired = id == "expire"
+
+    async def _request(self):
+        for trace_config in self._trace_configs:
+            for callback in trace_config.on_request_start:
+                await callback(None, None, None)
+        if log := os.environ.get("FAKE_SCRAPER_LOG"):
+            with open(log, "a") as f:
+                f.write(f"{time.time()}\n")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    async def login(self):
+        await self._request()
+
+    async def relogin(self):
+        self._expired = False
+        await self._request()
+
+    async def get(self, year, month):
+        await self._request()
+        if self._expired and (year, month) == (2020, 2):
+            raise SessionExpired
+        if self._id == "err" and (year, month) == (2020, 2):
+            raise MFScraptingError
+        if self._id == "down" and (year, month) == (2020, 2):
+            raise MFConnectionError
+        return [
+            MFTransaction(i, datetime.date(year, month, 1), -100, ("bank",), content="x" * 100)
+            for i in range(50)
+        ]
+
+
+def make_backfill(tmp_path, users, sink, start=(2020, 1), end=(2020, 3), **kwargs):
+    kwargs.setdefault("requests_per_second", 1000)
+    return MFBackfill(
+        {user: "" for user in users},
+        start,
+        end,
+        sink,
+        str(tmp_path / "checkpoint.jsonl"),
+        scraper_class=FakeScraper,
+        **kwargs,
+    )
+
+
+def collect():
+    results: list[MFBackfillResult] = []
+
+    async def sink(result):
+        results.append(result)
+
+    return results, sink
+
+
+def keys(results):
+    return sorted((r.user, r.year, r.month) for r in results)
+
+
+def test_month_range():
+    assert month_range((2019, 11), (2020, 2)) == [(2019, 11), (2019, 12), (2020, 1), (2020, 2)]
+
+
+def test_invalid_arguments(tmp_path):
+    results, sink = collect()
+    with pytest.raises(ValueError):
+        make_backfill(tmp_path, ["a"], sink, max_workers=0)
+    with pytest.raises(ValueError):
+        make_backfill(tmp_path, ["a"], sink, requests_per_second=0)
+
+
+def test_run_and_resume(tmp_path):
+    results, sink = collect()
+    (tmp_path / "checkpoint.jsonl").write_text('5\n["a", 2020, 1]\n')
+    backfill = make_backfill(tmp_path, ["a", "err", "down"], sink, max_workers=3)
+    errors = asyncio.run(backfill.run())
+    assert sorted(errors) == [("down", (2020, 2)), ("err", (2020, 2))]
+    assert isinstance(errors[("err", (2020, 2))], MFScraptingError)
+    assert isinstance(errors[("down", (2020, 2))], MFConnectionError)
+    assert keys(results) == [
+        ("a", 2020, 2),
+        ("a", 2020, 3),
+        ("down", 2020, 1),
+        ("err", 2020, 1),
+        ("err", 2020, 3),
+    ]
+    results.clear()
+    errors = asyncio.run(backfill.run())
+    assert sorted(errors) == [("down", (2020, 2)), ("err", (2020, 2))]
+    assert results == []
+
+
+def test_session_expired_relogins(tmp_path):
+    results, sink = collect()
+    backfill = make_backfill(tmp_path, ["expire"], sink)
+    assert asyncio.run(backfill.run()) == {}
+    assert keys(results) == [("expire", 2020, 1), ("expire", 2020, 2), ("expire", 2020, 3)]
+
+
+def test_request_budget_is_shared(tmp_path, monkeypatch):
+    log = tmp_path / "requests.log"
+    monkeypatch.setenv("FAKE_SCRAPER_LOG", str(log))
+    results, sink = collect()
+    rate = 20
+    backfill = make_backfill(
+        tmp_path, ["a", "b", "c"], sink, max_workers=3, requests_per_second=rate
+    )
+    assert asyncio.run(backfill.run()) == {}
+    times = sorted(float(x) for x in log.read_text().split())
+    # one login and three months per user
+    assert len(times) == 12
+    assert times[-1] - times[0] >= (len(times) - 1) / rate - 0.01
+    assert min(b - a for a, b in zip(times, times[1:])) >= 1 / rate - 0.01
+
+
+def test_interrupted_run_returns_and_resumes(tmp_path):
+    users = [f"user{i}" for i in range(8)]
+    calls = 0
+
+    async def failing_sink(result):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise RuntimeError
+
+    backfill = make_backfill(tmp_path, users, failing_sink, (2000, 1), (2020, 12), max_workers=4)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(backfill.run(), 60)
+
+    asyncio.run(main())
+    lines = (tmp_path / "checkpoint.jsonl").read_text().splitlines()
+    assert len(lines) == 1
+    done = tuple(json.loads(lines[0]))
+
+    results, sink = collect()
+    backfill = make_backfill(tmp_path, users, sink, (2000, 1), (2020, 12), max_workers=4)
+    assert asyncio.run(backfill.run()) == {}
+    assert len(set(keys(results))) == len(results) == len(users) * 252 - 1
+    assert done not in keys(results)
@@ -0,0 +1,120 @@
+import asyncio
+import datetime
+
+import pytest
+
+from mfscraping_asyncio.daemon import MFDaemon, MFSyncResult
+from mfscraping_asyncio.exceptions import MFConnectionError, NeedOTP, SessionExpired
+
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
+
+class FakeScraper:
+    def __init__(self, fetch_errors=(), relogin_errors=(), update_date=None):
+        self.is_logined = True
+        self.fetch_errors = list(fetch_errors)
+        self.relogin_errors = list(relogin_errors)
+        self.update_date = update_date or {"/a": datetime.datetime.now(JST)}
+        self.refreshed: list[str] = []
+        self.attempted = None
+        self.relogins = 0
+        self.fetches = 0
+        self.gets = 0
+        self.balances = 0
+
+    async def relogin(self):
+        self.relogins += 1
+        if self.relogin_errors:
+            raise self.relogin_errors.pop(0)
+
+    async def fetch(self, delta=60, attempted=None):
+        self.fetches += 1
+        self.attempted = dict(attempted or {})
+        if self.fetch_errors:
+            raise self.fetch_errors.pop(0)
+        return dict(self.update_date), list(self.refreshed)
+
+    async def get(self, year, month):
+        self.gets += 1
+        return []
+
+    async def get_balance(self):
+        self.balances += 1
+        return {}
+
+
+class RecordingDaemon(MFDaemon):
+    def __init__(self, *args, iterations: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.iterations = iterations
+        self.waits: list[float] = []
+
+    async def _wait(self, interval):
+        self.waits.append(interval)
+        if len(self.waits) >= self.iterations:
+            self.stop()
+
+
+def make_daemon(scraper, iterations, **kwargs):
+    results: list[MFSyncResult] = []
+
+    async def sink(result):
+        results.append(result)
+
+    daemon = RecordingDaemon(
+        scraper, sink, iterations=iterations, **kwargs  # type: ignore[arg-type]
+    )
+    return daemon, results
+
+
+def test_unchanged_timestamps_skip_scrape():
+    scraper = FakeScraper()
+    daemon, results = make_daemon(scraper, 3, months=2)
+    asyncio.run(daemon.run())
+    assert scraper.fetches == 3
+    assert scraper.gets == 2
+    assert scraper.balances == 1
+    assert len(results) == 1
+    assert list(results[0].transactions) == daemon._target_months(results[0].synced_at)
+
+
+def test_changed_timestamps_publish_again():
+    scraper = FakeScraper()
+    daemon, results = make_daemon(scraper, 1)
+    asyncio.run(daemon.run())
+    scraper.update_date = {"/a": datetime.datetime.now(JST) + datetime.timedelta(minutes=1)}
+    daemon.iterations = 2
+    asyncio.run(daemon.run())
+    assert len(results) == 2
+    assert results[1].update_date == scraper.update_date
+
+
+def test_errors_back_off_exponentially():
+    scraper = FakeScraper(
+        fetch_errors=[SessionExpired()],
+        relogin_errors=[MFConnectionError(), MFConnectionError(), SessionExpired()],
+    )
+    daemon, results = make_daemon(scraper, 5, retry_interval=1, min_interval=10, max_interval=6)
+    asyncio.run(daemon.run())
+    assert daemon.waits[:4] == [1, 2, 4, 6]
+    assert scraper.relogins == 4
+    assert len(results) == 1
+
+
+def test_login_errors_stop_daemon():
+    scraper = FakeScraper(fetch_errors=[SessionExpired()], relogin_errors=[NeedOTP()])
+    daemon, results = make_daemon(scraper, 10)
+    with pytest.raises(NeedOTP):
+        asyncio.run(daemon.run())
+    assert daemon.waits == [60]
+
+
+def test_failed_refresh_is_scheduled_from_attempt():
+    old = datetime.datetime.now(JST) - datetime.timedelta(days=3)
+    scraper = FakeScraper(update_date={"/a": old, "/b": datetime.datetime.now(JST)})
+    scraper.refreshed = ["/a"]
+    daemon, results = make_daemon(scraper, 2, delta=60, max_interval=7200)
+    asyncio.run(daemon.run())
+    assert daemon.waits[0] == pytest.approx(3600, abs=5)
+    assert list(scraper.attempted or {}) == ["/a"]
+    assert len(results) == 1
@@ -0,0 +1,88 @@
+import asyncio
+import datetime
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from mfscraping_asyncio import MFScraper
+from mfscraping_asyncio.exceptions import MFConnectionError, SessionExpired
+
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
+
+def account_html(href: str, update_date: datetime.datetime) -> str:
+    return (
+        '<li><div><div class="date">取得日時('
+        + update_date.strftime("%m/%d %H:%M")
+        + ')</div><p><a data-remote="true" href="'
+        + href
+        + '">更新</a></p></div></li>'
+    )
+
+
+def test_fetch_refreshes_stale_accounts_only():
+    now = datetime.datetime.now(JST).replace(second=0, microsecond=0)
+    old = now - datetime.timedelta(hours=2)
+    new = now - datetime.timedelta(minutes=5)
+    pages = [
+        account_html("/q/1", old) + account_html("/q/2", new) + account_html("/q/3", old),
+        account_html("/q/1", now) + account_html("/q/2", new) + account_html("/q/3", old),
+    ]
+    posts = []
+
+    async def _get(url):
+        if url.endswith("/accounts/polling"):
+            return '{"loading": false}'
+        return pages.pop(0)
+
+    async def _post(url, post_data, is_text):
+        posts.append(url)
+        return ""
+
+    async def main():
+        mf = MFScraper("", "")
+        mf._get = _get  # type: ignore[method-assign]
+        mf._post = _post  # type: ignore[method-assign]
+        attempted = {"/q/3": now - datetime.timedelta(minutes=10)}
+        return await mf.fetch(delay=0, delta=60, attempted=attempted)
+
+    update_date, refreshed = asyncio.run(main())
+    assert posts == ["https://moneyforward.com/q/1"]
+    assert refreshed == ["/q/1"]
+    assert update_date == {"/q/1": now, "/q/2": new, "/q/3": old}
+    assert pages == []
+
+
+@pytest.mark.parametrize("status", [401, 403])
+def test_unauthorized_is_session_expired(status):
+    async def handler(request):
+        return web.Response(status=status)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/", handler)
+        async with TestServer(app) as server, MFScraper("", "") as mf:
+            await mf._get(str(server.make_url("/")))
+
+    with pytest.raises(SessionExpired):
+        asyncio.run(main())
+
+
+def test_get_account_drops_failed_task():
+    calls = 0
+
+    async def _get(url):
+        nonlocal calls
+        calls += 1
+        raise MFConnectionError()
+
+    async def main():
+        mf = MFScraper("", "")
+        mf._get = _get  # type: ignore[method-assign]
+        for _ in range(2):
+            with pytest.raises(MFConnectionError):
+                await mf.get_account()
+
+    asyncio.run(main())
+    assert calls == 2